@@ -1,6 +1,5 @@
 import dataclasses
 import datetime
-import itertools
 import re
 import sqlite3
 from collections import defaultdict
@@ -29,7 +28,10 @@ class Connections:
     SQLite database"""
 
     connections_map = {}
-    created_connections = set()
+    # Dictionnaries keep the insertion order which
+    # a set does not: the last key is always the
+    # connection that was created last
+    created_connections = {}
 
     def __repr__(self):
         return f'<Connections: count={len(self.connections_map.keys())}>'
@@ -68,7 +70,7 @@ class Connections:
             name = 'default'
 
         self.connections_map[name] = connection
-        self.created_connections.add(connection)
+        self.created_connections[connection] = None
 
 
 connections = Connections()
@@ -267,7 +269,7 @@ def row_factory(backend):
     return inner_factory
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class AnnotationMap:
     sql_statements_dict: dict = field(default_factory=dict)
     alias_fields: list = field(default_factory=list)
@@ -282,15 +284,15 @@ class AnnotationMap:
                 statements.append(f'{sql}')
                 continue
             statements.append(f'{sql} as {alias}')
-        return list(itertools.chain(statements))
+        return statements
+
+    grouping_types = frozenset(['Count', 'Length'])
 
     @property
     def requires_grouping(self):
-        values = list(self.annotation_type_map.values())
-        return any([
-            'Count' in values,
-            'Length' in values
-        ])
+        return not self.grouping_types.isdisjoint(
+            self.annotation_type_map.values()
+        )
 
 
 class SQL(ExpressionFiltersMixin):
@@ -298,7 +300,7 @@ class SQL(ExpressionFiltersMixin):
 
     ALTER_TABLE = 'alter table {table} add column {params}'
     CREATE_TABLE = 'create table if not exists {table} ({fields})'
-    CREATE_INDEX = 'create index {name} on {table} ({fields})'
+    CREATE_INDEX = 'create index if not exists {name} on {table} ({fields})'
     DROP_TABLE = 'drop table if exists {table}'
     DROP_INDEX = 'drop index if exists {value}'
     DELETE = 'delete from {table}'
@@ -635,6 +637,17 @@ class SQLiteBackend(SQL):
     new connection to an sqlite database. The connection
     can be in memory or to a physical database"""
 
+    # Settings applied once when the connection is
+    # opened. journal_mode is ignored by sqlite for
+    # databases that are in memory
+    connection_pragmas = [
+        'pragma journal_mode=wal',
+        'pragma synchronous=normal',
+        'pragma cache_size=-16000',
+        'pragma mmap_size=268435456',
+        'pragma temp_store=memory'
+    ]
+
     def __init__(self, database_or_name=None, log_queries=False, path=None):
         self.database_name = None
         self.database_path = None
@@ -692,6 +705,8 @@ class SQLiteBackend(SQL):
         StDev.create_function(connection)
         CoefficientOfVariation.create_function(connection)
 
+        pragmas = [f'{pragma};' for pragma in self.connection_pragmas]
+        connection.executescript(' '.join(pragmas))
         connection.row_factory = row_factory(self)
 
         self.connection = connection
@@ -730,27 +745,61 @@ class SQLiteBackend(SQL):
         query.add_sql_node(f'pragma table_info({table.name})')
         return QuerySet(query)
 
-    def create_table_fields(self, table, columns_to_create):
-        field_params = []
-        if columns_to_create:
-            while columns_to_create:
-                column_to_create = columns_to_create.pop()
-                field = table.fields_map[column_to_create]
-                field_params.append(field.field_parameters())
-
-            statements = [self.simple_join(param) for param in field_params]
-            for i, statement in enumerate(statements):
-                if i > 1:
-                    statement = f'add table {statement}'
-                statements[i] = statement
+    def list_all_table_columns(self):
+        """Returns the column names for all the tables
+        of the database in a single query as opposed to
+        calling `list_table_columns` for each table
+
+        >>> self.list_all_table_columns()
+        ... {'celebrities': {'id', 'name'}}
+        """
+        select_clause = self.SELECT.format_map({
+            'fields': self.comma_join([
+                'm.name as table_name',
+                'p.name as column_name'
+            ]),
+            'table': 'sqlite_schema as m join pragma_table_info(m.name) as p'
+        })
+        where_clause = self.WHERE_CLAUSE.format_map({
+            'params': self.EQUALITY.format_map({
+                'field': 'm.type',
+                'value': self.quote_value('table')
+            })
+        })
+        query = Query(backend=self)
+        query.map_to_sqlite_table = True
+        query.add_sql_nodes([select_clause, where_clause])
+        query.run()
+
+        columns = defaultdict(set)
+        for row in query.result_cache:
+            columns[row['table_name']].add(row['column_name'])
+        return columns
+
+    def create_table_fields_sql(self, table, columns_to_create):
+        """Returns the `alter table` statements used to
+        create the given columns on an existing table. SQLite
+        only allows one column to be added per statement
+
+        >>> self.create_table_fields_sql(table, {'age'})
+        ... ['alter table celebrities add column age integer null']
+        """
+        statements = []
+        for name, field in table.fields_map.items():
+            if name not in columns_to_create:
+                continue
 
             alter_sql = self.ALTER_TABLE.format_map({
                 'table': table.name,
-                'params': self.simple_join(statements)
+                'params': self.simple_join(field.field_parameters())
             })
-            query = Query(table=table)
-            query.add_sql_nodes([alter_sql])
-            query.run(commit=True)
+            statements.append(alter_sql)
+        return statements
+
+    def create_table_fields(self, table, columns_to_create):
+        statements = self.create_table_fields_sql(table, columns_to_create)
+        if statements:
+            Query.run_script(backend=self, table=table, sql_tokens=statements)
 
     def list_all_tables(self):
         select_clause = self.SELECT.format(
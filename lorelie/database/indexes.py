@@ -21,7 +21,7 @@ class Index:
 
     >>> table = Table('celebrities', index=[Index('index_name', 'firstname')])
     """
-    template_sql = 'create index {name} on {table} ({fields})'
+    template_sql = 'create index if not exists {name} on {table} ({fields})'
     prefix = 'idx'
     max_name_length = 30
 
@@ -1,37 +1,215 @@
 import datetime
+import hashlib
 import json
-import secrets
-from collections import defaultdict
-import dataclasses
+import os
+import pathlib
 from dataclasses import dataclass, field
 from functools import cached_property
 
 from lorelie.backends import SQLiteBackend, connections
 from lorelie.database.nodes import InsertNode
-from lorelie.fields.base import CharField, DateTimeField, Field, JSONField
+from lorelie.fields.base import (BinaryField, BooleanField, CharField,
+                                 DateField, DateTimeField, Field, FloatField,
+                                 IntegerField, JSONField)
 from lorelie.queries import Query
 from lorelie.tables import Table
 
-
-@dataclass
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Maps the SQL type stored in the parameters
+# of a migrated field to the field class used
+# to reconstruct it. Types that are not in the
+# registry fall back on the base Field
+FIELD_CLASSES_REGISTRY = {
+    'text': CharField,
+    'varchar': CharField,
+    'integer': IntegerField,
+    'real': FloatField,
+    'boolean': BooleanField,
+    'date': DateField,
+    'datetime': DateTimeField,
+    'blob': BinaryField
+}
+
+
+@dataclass(slots=True)
 class Schema:
+    """Represents the state of a table for a
+    given migration. The containers are only
+    created when they are written to"""
+
     table: type = None
     database: type = None
-    fields: list = field(default_factory=list)
-    field_params: list = field(default_factory=list)
-    indexes: dict = field(default_factory=dict)
-    constraints: dict = field(default_factory=dict)
+    fields: list = None
+    field_params: list = None
+    indexes: dict = None
+    constraints: dict = None
+    _hash: int = field(default=0, init=False, repr=False, compare=False)
 
     def __hash__(self):
-        return hash((self.table.name, self.database.database_name))
-
-    def prepare(self):
+        # The table and the database do not change
+        # once they are set on the schema which means
+        # that the hash only needs to be computed once.
+        # A schema that was just created does not have
+        # them yet and its hash should not be cached
+        if self._hash:
+            return self._hash
+
+        table_name = getattr(self.table, 'name', None)
+        database_name = getattr(self.database, 'database_name', None)
+        value = hash((table_name, database_name))
+        if self.table is not None and self.database is not None:
+            self._hash = value
+        return value
+
+    def prepare(self, field_params=None):
         self.fields = self.table.field_names
-        self.field_params = list(self.table.build_all_field_parameters())
+        if field_params is None:
+            field_params = list(self.table.build_all_field_parameters())
+        self.field_params = field_params
 
     def to_dict(self):
-        for field in dataclasses.fields(self):
-            pass
+        return {
+            'name': self.table.name,
+            'fields': self.fields,
+            'field_params': self.field_params,
+            'indexes': self.indexes,
+            'constraints': self.constraints
+        }
+
+
+def schema_encoder(value):
+    """Allows the json module to serialize the
+    schemas of a migration. Each schema is only
+    converted to a dictionnary at the moment
+    where it gets written to the file"""
+    if isinstance(value, Schema):
+        return value.to_dict()
+    raise TypeError(
+        f"Object of type {value.__class__.__name__} "
+        "is not JSON serializable"
+    )
+
+
+def migration_id():
+    """Returns a random identifier for a migration. The
+    identifier does not need to be cryptographically secure
+    so the bytes are read directly from `os.urandom`"""
+    return os.urandom(5).hex()
+
+
+def migration_date():
+    """Returns the current date used to
+    timestamp a migration e.g. 2024-01-01 10:00:00"""
+    return datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+
+
+def read_migration_file(path):
+    """Reads the content of a migration file using
+    orjson when it is installed and falls back to
+    the standard json module otherwise"""
+    content = pathlib.Path(path).read_bytes()
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def write_migration_file(path, content):
+    """Writes the content of a migration file using
+    orjson when it is installed and falls back to
+    the standard json module otherwise. The content is
+    written to a temporary file which then replaces the
+    migration file so that it is never left half written"""
+    temporary_path = f'{os.fspath(path)}.tmp'
+
+    try:
+        if orjson is not None:
+            # Schema is a dataclass which orjson would serialize
+            # natively: pass it through to schema_encoder instead
+            payload = orjson.dumps(
+                content,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATACLASS,
+                default=schema_encoder
+            )
+            with open(temporary_path, mode='wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            # The content is encoded and written chunk by
+            # chunk which avoids holding the full serialized
+            # migration in memory before writing it
+            with open(temporary_path, mode='w', encoding='utf-8') as f:
+                json.dump(
+                    content,
+                    f,
+                    indent=4,
+                    ensure_ascii=False,
+                    default=schema_encoder
+                )
+                f.flush()
+                os.fsync(f.fileno())
+    except Exception:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+    os.replace(temporary_path, path)
+
+
+def schema_fingerprint(tables, field_params_map=None, backend=None):
+    """Returns a hash of the fields, the indexes and the
+    constraints of the given tables. When it matches the one
+    stored in the migration file, the schema of the tables has
+    not changed since the last migration. The field
+    parameters that were already built for a table can
+    be passed in `field_params_map`"""
+    if field_params_map is None:
+        field_params_map = {}
+
+    state = []
+    for table in sorted(tables, key=lambda x: x.name):
+        if table.name == 'lorelie_migrations':
+            continue
+
+        table_backend = backend or table.backend
+
+        # The generated name of the index changes each time
+        # the table is created and is removed from its sql
+        indexes = []
+        for index in table.indexes:
+            index_sql = index.as_sql(table_backend)
+            definition = index_sql.split(index.index_name, 1)[1]
+            indexes.append((index.name, definition))
+        indexes.sort()
+
+        constraints = sorted(
+            constraint.as_sql(table_backend)
+            for constraint in table.table_constraints
+        )
+
+        field_params = field_params_map.get(table.name)
+        if field_params is None:
+            field_params = list(table.build_all_field_parameters())
+        state.append((table.name, field_params, indexes, constraints))
+    return hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
+
+
+def serialize_migration(content):
+    """Serializes the content of a migration in
+    order to store it in the migrations table"""
+    if orjson is not None:
+        payload = orjson.dumps(
+            content,
+            option=orjson.OPT_PASSTHROUGH_DATACLASS,
+            default=schema_encoder
+        )
+        return payload.decode('utf-8')
+    return json.dumps(content, ensure_ascii=False, default=schema_encoder)
 
 
 def migration_validator(value):
@@ -47,11 +225,20 @@ class Migrations:
 
     CACHE = {}
     backend_class = SQLiteBackend
+    insert_migration_sql = (
+        'insert into lorelie_migrations (name, table_name, migration, applied) '
+        'values (?, ?, ?, ?)'
+    )
 
     def __init__(self, database):
         self.file = database.path / 'migrations.json'
         self.database = database
         self.database_name = database.database_name or 'memory'
+        # The connection is created by the database
+        # just before the migrations so the same one
+        # is reused for every migrate/make_migrations
+        self.backend = connections.get_last_connection()
+        self.backend.linked_to_table = 'sqlite'
         self.CACHE = self.read_content
         self.file_id = self.CACHE['id']
 
@@ -60,9 +247,7 @@ class Migrations:
         except KeyError:
             raise KeyError('Migration file is not valid')
 
-        self.migration_table_map = [table['name'] for table in self.tables]
-        self.fields_map = defaultdict(list)
-
+        self.migration_table_map = {table['name'] for table in self.tables}
         self.tables_for_creation = set()
         self.tables_for_deletion = set()
         self.existing_tables = set()
@@ -72,7 +257,7 @@ class Migrations:
         # the underlying database can be
         # fully functionnal
         self.migrated = False
-        self.schemas = defaultdict(Schema)
+        self.schemas = {}
         self.pending_migration = {}
 
     def __repr__(self):
@@ -80,17 +265,28 @@ class Migrations:
 
     @property
     def in_memory(self):
-        return self.database_name is None
+        return self.database.in_memory
 
     @cached_property
     def read_content(self):
+        # An in-memory database starts empty on
+        # each run so a migration file on disk
+        # would not describe its state
+        if self.in_memory:
+            return self.blank_migration()
+
         try:
-            with open(self.file, mode='r') as f:
-                return json.load(f)
+            return read_migration_file(self.file)
         except FileNotFoundError:
             # Create a blank migration file
             return self.blank_migration()
 
+    @cached_property
+    def tables_by_name(self):
+        """Maps the name of each table of the
+        migration file to its definition"""
+        return {table['name']: table for table in self.tables}
+
     # def _write_fields(self, table):
     #     """Parses the different fields from
     #     a given table for a migration file"""
@@ -125,11 +321,21 @@ class Migrations:
     #         ]
     #     return indexes
 
+    def _get_or_create_schema(self, table):
+        """Returns the schema for the given table
+        and creates it, already bound to the table
+        and the database, if it does not exist yet"""
+        try:
+            return self.schemas[table.name]
+        except KeyError:
+            schema = Schema(table=table, database=self.database)
+            self.schemas[table.name] = schema
+            return schema
+
     def create_migration_table(self):
         """Creates a migrations table in the database
         which stores the different configuration for
         the current database"""
-        from lorelie.tables import Table
         table_fields = [
             CharField('name', null=False, unique=True),
             CharField('table_name', null=False),
@@ -148,31 +354,63 @@ class Migrations:
         self.database._add_table(table)
 
     def migrate(self, table_instances):
-        from lorelie.tables import Table
-
         # Safeguard that avoids calling
         # this function in a loop over and
         # over which can reduce performance
         if self.migrated:
             return True
 
-        errors = []
-        for name, table_instance in table_instances.items():
-            if not isinstance(table_instance, Table):
-                errors.append(
-                    f"Value should be instance "
-                    f"of Table. Got: {table_instance}"
-                )
-            schema = self.schemas[name]
-            schema.table = table_instance
-            schema.database = self.database
-
+        errors = [
+            f"Value should be instance of Table. Got: {table_instance}"
+            for table_instance in table_instances.values()
+            if not isinstance(table_instance, Table)
+        ]
         if errors:
             raise ValueError(*errors)
 
+        for table_instance in table_instances.values():
+            self._get_or_create_schema(table_instance)
+
         if not table_instances:
             return
 
+        backend = self.backend
+        database_tables = backend.list_all_tables()
+
+        # Build the set of names once so that the
+        # comparisons below are simple set lookups
+        database_table_names = {row['name'] for row in database_tables}
+
+        # The parameters of the fields are built once and
+        # reused for the fingerprint and the tables to create
+        field_params_map = {
+            name: list(table.build_all_field_parameters())
+            for name, table in table_instances.items()
+        }
+        fingerprint = schema_fingerprint(
+            table_instances.values(),
+            field_params_map=field_params_map,
+            backend=backend
+        )
+
+        # When the tables did not change since the last
+        # migration that was applied to the database and all
+        # of them still exist, there is nothing to inspect or
+        # create. The fingerprint written by make_migrations
+        # cannot be used since it describes the tables that
+        # are expected and not the ones that were created
+        if (fingerprint == self.CACHE.get('applied_fingerprint') and
+                not self.pending_migration and
+                'lorelie_migrations' in database_table_names and
+                database_table_names.issuperset(table_instances.keys())):
+            if 'lorelie_migrations' not in table_instances:
+                self.create_migration_table()
+
+            for table in table_instances.values():
+                table.is_prepared = True
+            self.migrated = True
+            return
+
         # There is a case where makemigrations() is not
         # called which infers that there is no migration
         # file. However, that does not mean that the tables
@@ -181,53 +419,58 @@ class Migrations:
         # passed to this function containing both the table
         # name and the Table instance
         if not self.migration_table_map:
-            self.migration_table_map = list(table_instances.keys())
+            self.migration_table_map = set(table_instances.keys())
+
+        migration_table_names = self.migration_table_map
 
-        backend = connections.get_last_connection()
-        backend.linked_to_table = 'sqlite'
-        database_tables = backend.list_all_tables()
         # When the table is in the migration file
         # and not in the database tables that we
         # listed above, it needs to be created
-        for table_name in self.migration_table_map:
-            if not table_name in database_tables:
-                self.tables_for_creation.add(table_name)
+        self.tables_for_creation.update(
+            migration_table_names - database_table_names
+        )
 
         # When the table is not in the migration
         # file but present in the database tables
         # that we listed above, it needs to be deleted
-        for database_row in database_tables:
-            if database_row['name'] not in self.migration_table_map:
-                self.tables_for_deletion.add(database_row)
+        self.tables_for_deletion.update(
+            database_table_names - migration_table_names
+        )
 
-        if ('lorelie_migrations' not in database_tables or
-                'lorelie_migrations' not in self.migration_table_map):
+        if ('lorelie_migrations' not in database_table_names or
+                'lorelie_migrations' not in migration_table_names):
             self.create_migration_table()
             self.tables_for_creation.add('lorelie_migrations')
 
+        # Every statement of the migration (tables, columns,
+        # indexes, constraints) is collected and then run
+        # together in a single script and transaction
+        other_sqls_to_run = []
+
         # Eventually create the tables
+        tables_to_prepare = []
         if self.tables_for_creation:
             for table_name in self.tables_for_creation:
                 table = table_instances.get(table_name, None)
                 if table is None:
                     continue
 
-                # This is the specific section
-                # that actually creates the table
-                # in the database
-                table.prepare(self.database)
+                create_sql = table.prepare_sql(
+                    self.database,
+                    field_params=field_params_map.get(table_name)
+                )
+                other_sqls_to_run.extend(create_sql)
+                tables_to_prepare.append(table)
             self.has_migrations = True
 
-        other_sqls_to_run = []
-
         # TODO: For now do not run tables
         # for deletion when doing migrations
         # we'll implement this afterwards
         # if self.tables_for_deletion:
         #     sql_script = []
-        #     for database_row in self.tables_for_deletion:
+        #     for table_name in self.tables_for_deletion:
         #         sql = self.backend_class.DROP_TABLE.format(
-        #             table=database_row['name']
+        #             table=table_name
         #         )
         #         sql_script.append(sql)
 
@@ -237,150 +480,249 @@ class Migrations:
 
         # For existing tables, check that the
         # fields are the same and well set as
-        # indicated in the migration file
-        for database_row in database_tables:
-            if (database_row['name'] in self.tables_for_creation or
-                    database_row['name'] in self.tables_for_deletion):
-                continue
-
-            table_instance = table_instances.get(database_row['name'], None)
+        # indicated in the migration file. The
+        # columns are fetched once for all the
+        # tables of the database
+        database_columns = backend.list_all_table_columns()
+        existing_table_names = database_table_names & migration_table_names
+        for table_name in existing_table_names - self.tables_for_creation:
+            table_instance = table_instances.get(table_name, None)
             if table_instance is None:
                 continue
 
-            self.check_fields(table_instance, backend)
+            existing_columns = database_columns[table_name]
+            other_sqls_to_run.extend(
+                self.check_fields(table_instance, existing_columns, backend)
+            )
 
+        # The indexes of the database are matched with the
+        # ones of the tables using their name and their
+        # definition. An index that did not change is kept
+        # as is instead of being dropped and created again
         database_indexes = backend.list_database_indexes()
-        for name, table in table_instances.items():
+        existing_index_names = set()
+        auto_index_names = set()
+        reusable_indexes = {}
+        for row in database_indexes:
+            existing_index_names.add(row['name'])
+
+            # We cannot and should not drop autoindexes which
+            # are created by sqlite. Anyways, it raises an error
+            if row['sql'] is None:
+                auto_index_names.add(row['name'])
+                continue
+
+            base_name, _, _ = row['name'].rpartition('_')
+            definition = row['sql'].split(row['name'], 1)[1]
+            reusable_indexes[(base_name, definition)] = row['name']
+
+        wanted_index_names = set()
+        for table in table_instances.values():
             for index in table.indexes:
-                other_sqls_to_run.append(index.as_sql(backend))
+                index_sql = index.as_sql(backend)
+                definition = index_sql.split(index.index_name, 1)[1]
+                base_name = f'{index.prefix}_{index.name}'
+
+                existing_name = reusable_indexes.get((base_name, definition))
+                if existing_name is None:
+                    other_sqls_to_run.append(index_sql)
+                else:
+                    index.index_name = existing_name
+                wanted_index_names.add(index.index_name)
+
+        # Remove the indexes that exist in the database
+        # but that are not defined on any of the tables
+        obsolete_index_names = (
+            existing_index_names - wanted_index_names - auto_index_names
+        )
+        for index_name in obsolete_index_names:
+            other_sqls_to_run.append(
+                backend.DROP_INDEX.format_map({'value': index_name})
+            )
 
-        # TODO: For now we will not remove obsolete
-        # indexes too. We will implement this after too
-        # Remove obsolete indexes
-        for row in database_indexes:
-            if row not in table.indexes:
-                # We cannot and should not drop autoindexes
-                # which are created by sqlite. Anyways, it
-                # raises an error
-                if 'sqlite_autoindex' in row.name:
-                    continue
+        # The script raises when one of its statements fails
+        # in which case it is rolled back as a whole. Nothing
+        # below should then run: the tables are not prepared,
+        # no migration is recorded and migrated stays False
+        try:
+            Query.run_script(backend=backend, sql_tokens=other_sqls_to_run)
+        except Exception:
+            self.tables_for_creation.clear()
+            self.tables_for_deletion.clear()
+            self.discard_fingerprint()
+            raise
 
-                other_sqls_to_run.append(
-                    backend.DROP_INDEX.format_map({
-                        'value': row['name']
-                    })
-                )
+        for table in tables_to_prepare:
+            table.is_prepared = True
 
         if self.pending_migration:
-            params = {
-                'name': f'mig_{secrets.token_hex(5)}',
-                'table_name': None,
-                'migration': self.pending_migration
+            # The statement is the same for every migration
+            # which allows sqlite to reuse its compiled version
+            # from the statement cache of the connection
+            table_names = [
+                schema.table.name
+                for schema in self.pending_migration['tables']
+            ]
+
+            # The row keeps track of the state of the
+            # tables that the migration was applied with
+            migration = {
+                **self.pending_migration,
+                'fingerprint': fingerprint
             }
+            values = (
+                f"mig_{self.pending_migration['id']}",
+                backend.comma_join(table_names),
+                serialize_migration(migration),
+                str(datetime.datetime.now())
+            )
             try:
-                self.database.objects.create('lorelie_migrations', **params)
-            except Exception:
-                raise
+                backend.connection.execute(self.insert_migration_sql, values)
             finally:
                 self.pending_migration = {}
 
-        # The database might require another set of
-        # parameters (ex. indexes, constraints) that we
-        # are going to run here
-        Query.run_script(backend=backend, sql_tokens=other_sqls_to_run)
+        # The fingerprint is only stored once the script and
+        # the migration were both successfully applied
+        if self.CACHE.get('applied_fingerprint') != fingerprint:
+            self.CACHE['applied_fingerprint'] = fingerprint
+            if not self.in_memory:
+                write_migration_file(self.file, self.CACHE)
+
+        # Now that the changes are committed, let sqlite
+        # refresh the statistics used by the query planner
+        # for the tables and indexes that were modified
+        backend.connection.execute('pragma optimize')
 
         self.tables_for_creation.clear()
         self.tables_for_deletion.clear()
         self.migrated = True
 
-    def check_fields(self, table, backend):
-        """Checks the migration file for fields
-        in relationship with the table"""
-        database_table_columns = backend.list_table_columns(table)
+    def discard_fingerprint(self):
+        """Removes the fingerprint of the last migration
+        when it could not be applied. Otherwise the next
+        call to make_migrations would consider the migration
+        to be already made and it would never be recorded"""
+        if self.CACHE.pop('fingerprint', None) is None:
+            return
 
-        columns_to_create = set()
-        for field_name in table.fields_map.keys():
-            if field_name not in database_table_columns:
-                columns_to_create.add(field_name)
+        if not self.in_memory:
+            write_migration_file(self.file, self.CACHE)
+
+    def check_fields(self, table, existing_columns, backend):
+        """Checks the migration file for fields
+        in relationship with the table. `existing_columns`
+        are the column names present for the table in
+        the database. Returns the statements required to
+        create the missing columns which are then run with
+        the rest of the migration script"""
+        columns_to_create = table.fields_map.keys() - existing_columns
 
         # TODO: Drop columns that were dropped in the database
 
-        self.schemas[table.name].fields = list(
-            map(lambda x: x['name'], database_table_columns)
-        )
-        backend.create_table_fields(table, columns_to_create)
+        schema = self._get_or_create_schema(table)
+        schema.fields = list(existing_columns)
+        return backend.create_table_fields_sql(table, columns_to_create)
 
     def blank_migration(self):
         """Creates a blank initial migration file"""
         migration_content = {}
 
-        # file_path = PROJECT_PATH / 'migrations.json'
-        file_path = self.database.path / 'migrations.json'
-        if not file_path.exists():
-            file_path.touch()
+        migration_content['id'] = migration_id()
+        migration_content['date'] = migration_date()
+        migration_content['number'] = 1
+        migration_content['tables'] = []
 
-        with open(file_path, mode='w') as f:
-            migration_content['id'] = secrets.token_hex(5)
-            migration_content['date'] = str(datetime.datetime.now())
-            migration_content['number'] = 1
-
-            migration_content['tables'] = []
-            json.dump(migration_content, f, indent=4, ensure_ascii=False)
-            return migration_content
+        if not self.in_memory:
+            write_migration_file(self.file, migration_content)
+        return migration_content
 
     def make_migrations(self, tables):
-        backend = connections.get_last_connection()
+        backend = self.backend
+
+        for table in tables:
+            if not isinstance(table, Table):
+                raise ValueError(f'{table} is not an instance of Table')
+
+        # The parameters of the fields are built once for
+        # the fingerprint and then reused for the schemas
+        field_params_map = {
+            table.name: list(table.build_all_field_parameters())
+            for table in tables
+        }
+        fingerprint = schema_fingerprint(
+            tables,
+            field_params_map=field_params_map,
+            backend=backend
+        )
+
+        # When nothing changed since the last migration, a
+        # new one would only rewrite the file and add a
+        # misleading entry to the migrations table
+        if fingerprint == self.CACHE.get('fingerprint'):
+            return
+
+        # Use the same id and date for the pending
+        # migration and the migration file
+        new_id = migration_id()
+        date = migration_date()
         migration = {
-            'id': secrets.token_hex(5),
-            'date': str(datetime.datetime.now()),
+            'id': new_id,
+            'date': date,
             'number': 1,
             'tables': []
         }
 
         for table in tables:
-            if not isinstance(table, Table):
-                raise ValueError(f'{table} is not an instance of Table')
-
-            schema = self.schemas[table.name]
-            schema.table = table
-            schema.database = self.database
+            schema = self._get_or_create_schema(table)
             migration['tables'].append(schema)
 
-            for constraint in table.table_constraints:
-                schema.constraints[constraint.name] = [
+            schema.constraints = {
+                constraint.name: [
                     constraint.name,
                     constraint.as_sql(backend)
                 ]
+                for constraint in table.table_constraints
+            }
+            # The indexes are recorded under the name given by
+            # the user since the generated name is replaced by
+            # the one in the database when the index is reused
+            schema.indexes = {
+                index.name: [index.fields]
+                for index in table.indexes
+            }
+            schema.prepare(field_params=field_params_map[table.name])
 
-            for index in table.indexes:
-                schema.indexes[index.index_name] = [
-                    index.fields
-                ]
-
-            schema.prepare()
         self.pending_migration = migration
 
         if self.has_migrations:
             cache_copy = self.CACHE.copy()
-            with open(self.database.path.joinpath('migrations.json'), mode='w+') as f:
-                cache_copy['id'] = secrets.token_hex(5)
-                cache_copy['date'] = str(datetime.datetime.now())
-                cache_copy['number'] = self.CACHE['number'] + 1
-                cache_copy['tables'] = migration['tables']
-                json.dump(cache_copy, f, indent=4, ensure_ascii=False)
+            cache_copy['id'] = new_id
+            cache_copy['date'] = date
+            cache_copy['number'] = self.CACHE['number'] + 1
+            cache_copy['tables'] = migration['tables']
+            cache_copy['fingerprint'] = fingerprint
+
+            if not self.in_memory:
+                write_migration_file(self.file, cache_copy)
+            self.CACHE = cache_copy
 
     def get_table_fields(self, name):
-        table_index = self.database.table_map.index(name)
-        return self.tables[table_index]['fields']
+        """Returns the parameters of the fields of the table
+        as written in the migration file where each entry
+        starts with the name and the type of the field"""
+        try:
+            return self.tables_by_name[name]['field_params']
+        except KeyError:
+            raise KeyError(f'{name} is not in the migration file')
 
     def reconstruct_table_fields(self, table):
         reconstructed_fields = []
         fields = self.get_table_fields(table)
-        for field in fields:
-            instance = Field.create(
-                field['name'],
-                field['params'],
-                verbose_name=field['verbose_name']
-            )
+        for name, *params in fields:
+            # Types such as varchar(255) are registered
+            # under their name without the length
+            field_type, _, _ = params[0].partition('(')
+            field_class = FIELD_CLASSES_REGISTRY.get(field_type, Field)
+            instance = field_class.create(name, params)
             reconstructed_fields.append(instance)
         return reconstructed_fields
@@ -17,6 +17,7 @@ multiple nodes together
 
 import dataclasses
 import re
+from functools import cached_property
 
 from lorelie.expressions import CombinedExpression, Q
 
@@ -42,23 +43,25 @@ class SelectMap:
         return self.select is not None
 
     def resolve(self, backend):
-        nodes = []
-        nodes.extend(self.select.as_sql(backend))
+        # The clauses follow the order required
+        # by sqlite: group by and having have to
+        # come before order by and limit
+        nodes = self.select.as_sql(backend)
 
         if self.where is not None:
             nodes.extend(self.where.as_sql(backend))
 
+        if self.groupby is not None:
+            nodes.append(self.groupby)
+
+        if self.having is not None:
+            nodes.append(self.having)
+
         if self.order_by is not None:
             nodes.extend(self.order_by.as_sql(backend))
 
         if self.limit is not None:
-            nodes.extend([f'limit {self.limit}'])
-
-        if self.groupby is not None:
-            nodes.extend([self.groupby])
-
-        if self.having is not None:
-            nodes.extend([self.having])
+            nodes.append(f'limit {self.limit}')
 
         return nodes
 
@@ -78,7 +81,11 @@ class RawSQL:
 
         self.nodes = list(nodes)
         self.backend = backend
-        self.resolve_select = 'select' in self.nodes[0]
+        first_node = self.nodes[0]
+        self.resolve_select = (
+            isinstance(first_node, BaseNode) and
+            first_node.node_name == 'select'
+        )
         self.select_map = SelectMap()
 
         if self.resolve_select:
@@ -133,11 +140,12 @@ class ComplexNode:
 
 
 class BaseNode:
+    node_name = NotImplemented
     template_sql = None
 
-    def __init__(self, table=None, fields=[]):
+    def __init__(self, table=None, fields=None):
         self.table = table
-        self.fields = fields or ['*']
+        self.fields = fields or ('*',)
 
     def __repr__(self):
         return f'<{self.__class__.__name__}>'
@@ -162,15 +170,12 @@ class BaseNode:
     def __call__(self, *fields):
         return NotImplemented
 
-    @property
-    def node_name(self):
-        return NotImplemented
-
     def as_sql(self, backend):
         return NotImplemented
 
 
 class SelectNode(BaseNode):
+    node_name = 'select'
     template_sql = 'select {fields} from {table}'
 
     def __init__(self, table, *fields, distinct=False, limit=None, view_name=None):
@@ -180,12 +185,16 @@ class SelectNode(BaseNode):
         self.view_name = view_name
 
     def __call__(self, *fields, **kwargs):
-        new_fields = self.fields.extend(fields)
-        return self.__class__(self.table, *new_fields, **kwargs)
-
-    @property
-    def node_name(self):
-        return 'select'
+        # Returns a new node with the additional
+        # fields, keeping the current options unless
+        # they are overriden in kwargs
+        options = {
+            'distinct': self.distinct,
+            'limit': self.limit,
+            'view_name': self.view_name
+        }
+        options.update(kwargs)
+        return self.__class__(self.table, *self.fields, *fields, **options)
 
     def as_sql(self, backend):
         select_sql = self.template_sql.format_map({
@@ -213,28 +222,36 @@ class WhereNode(BaseNode):
     ... "where name='Kendall'"
     """
 
+    node_name = 'where'
     template_sql = 'where {params}'
 
     def __init__(self, *args, **expressions):
         self.expressions = expressions
         self.func_expressions = list(args)
         self.invert = False
+        # The rendered clause is kept for the backend
+        # it was built for and is reset each time the
+        # node receives new expressions
+        self.cached_sql = None
         super().__init__()
 
     def __call__(self, *args, **expressions):
         self.expressions.update(expressions)
         self.func_expressions.extend(args)
+        self.cached_sql = None
         return self
 
     def __invert__(self):
         self.invert = True
+        self.cached_sql = None
         return self
 
-    @property
-    def node_name(self):
-        return 'where'
-
     def as_sql(self, backend):
+        if self.cached_sql is not None:
+            cached_backend, sql = self.cached_sql
+            if cached_backend is backend:
+                return list(sql)
+
         # First, resolve Q, CombinedExpression to
         # their SQL representation. They are more
         # complex SQL expressions
@@ -262,15 +279,22 @@ class WhereNode(BaseNode):
             joined_resolved = f'not {joined_resolved}'
 
         where_clause = self.template_sql.format(params=joined_resolved)
+        self.cached_sql = (backend, [where_clause])
         return [where_clause]
 
 
 class OrderByNode(BaseNode):
+    node_name = 'order_by'
     template_sql = 'order by {fields}'
+    field_regex = re.compile(r'^(\-)?(\w+)$')
 
     def __init__(self, table, *fields):
         self.ascending = set()
         self.descending = set()
+        # The fields in the order in which they were
+        # declared which is the order in which sqlite
+        # applies them when sorting the rows
+        self.ordered_fields = []
         super().__init__(table=table, fields=fields)
 
         for field in self.fields:
@@ -279,7 +303,7 @@ class OrderByNode(BaseNode):
                     "Field should be of type <str>"
                 )
 
-            result = re.match(r'^(\-)?(\w+)$', field)
+            result = self.field_regex.match(field)
             if result:
                 sign, name = result.groups()
 
@@ -294,12 +318,13 @@ class OrderByNode(BaseNode):
                     self.descending.add(name)
                 else:
                     self.ascending.add(name)
+                self.ordered_fields.append((name, not sign))
 
-        self.cached_fields = list(self.ascending.union(self.descending))
-
-    @property
-    def node_name(self):
-        return 'order_by'
+        self.cached_fields = [name for name, _ in self.ordered_fields]
+        # The fields do not change once the node is
+        # created which means that the clause only
+        # needs to be rendered once for a backend
+        self.cached_sql = None
 
     def __hash__(self):
         return hash((self.node_name, *self.fields))
@@ -308,9 +333,11 @@ class OrderByNode(BaseNode):
         if not isinstance(node, OrderByNode):
             return NotImplemented
 
-        other_fields = set(node.fields)
-        other_fields.update(self.fields)
-        return node.__class__(self.table, *list(other_fields))
+        # Duplicates are removed while keeping the
+        # fields of the current node first
+        other_fields = dict.fromkeys(self.fields)
+        other_fields.update(dict.fromkeys(node.fields))
+        return node.__class__(self.table, *other_fields)
 
     @staticmethod
     def construct_sql(backend, field, ascending=True):
@@ -323,17 +350,18 @@ class OrderByNode(BaseNode):
             return backend.DESCENDING.format_map({'field': field})
 
     def as_sql(self, backend):
-        ascending_fields = map(
-            lambda x: self.construct_sql(backend, x),
-            self.ascending
-        )
-        descending_fields = map(
-            lambda x: self.construct_sql(backend, x, ascending=False),
-            self.descending
-        )
-        conditions = list(ascending_fields) + list(descending_fields)
+        if self.cached_sql is not None:
+            cached_backend, sql = self.cached_sql
+            if cached_backend is backend:
+                return list(sql)
+
+        conditions = [
+            self.construct_sql(backend, name, ascending=ascending)
+            for name, ascending in self.ordered_fields
+        ]
         fields = backend.comma_join(conditions)
         ordering_sql = backend.ORDER_BY.format_map({'conditions': fields})
+        self.cached_sql = (backend, [ordering_sql])
         return [ordering_sql]
 
 
@@ -363,6 +391,7 @@ class UpdateNode(BaseNode):
     Note: https://www.sqlitetutorial.net/sqlite-update/
     """
 
+    node_name = 'update'
     template_sql = 'update {table} set {fields}'
 
     def __init__(self, table, update_defaults, *where_args, **where_expressions):
@@ -371,12 +400,13 @@ class UpdateNode(BaseNode):
         self.where_expressions = where_expressions
         self.update_defaults = update_defaults
 
-    @property
-    def node_name(self):
-        return 'update'
+    @cached_property
+    def where_node(self):
+        # Built once so that the where clause is
+        # only rendered once for the backend
+        return WhereNode(*self.where_args, **self.where_expressions)
 
     def as_sql(self, backend):
-        where_node = WhereNode(*self.where_args, **self.where_expressions)
         fields_to_set = backend.parameter_join(self.update_defaults)
 
         update_sql = self.template_sql.format_map({
@@ -385,31 +415,32 @@ class UpdateNode(BaseNode):
         })
         sql = [
             update_sql,
-            *where_node.as_sql(backend)
+            *self.where_node.as_sql(backend)
         ]
         return sql
 
 
 class DeleteNode(BaseNode):
-    def __init__(self, table, *where_args, order_by=[], limit=None, **where_expressions):
+    node_name = 'delete'
+
+    def __init__(self, table, *where_args, order_by=None, limit=None, **where_expressions):
         super().__init__(table=table)
         self.where_args = where_args
         self.where_expressions = where_expressions
-        self.order_by = order_by
+        self.order_by = order_by or []
         self.limit = limit
 
-    @property
-    def node_name(self):
-        return 'delete'
+    @cached_property
+    def where_node(self):
+        return WhereNode(*self.where_args, **self.where_expressions)
 
     def as_sql(self, backend):
         delete_sql = backend.DELETE.format_map({
             'table': self.table.name
         })
-        where_node = WhereNode(*self.where_args, **self.where_expressions)
         sql = [
             delete_sql,
-            *where_node.as_sql(backend)
+            *self.where_node.as_sql(backend)
         ]
 
         if self.order_by:
@@ -434,36 +465,52 @@ class InsertNode(BaseNode):
     Note: https://www.sqlitetutorial.net/sqlite-insert/
     """
 
+    node_name = 'insert'
     template_sql = 'insert into {table} ({columns}) values({values})'
     bactch_insert_sql = 'insert into {table} ({columns}) values {values}'
 
-    def __init__(self, table, batch_values=[], insert_values={}, returning=[]):
+    def __init__(self, table, batch_values=None, insert_values=None, returning=None):
         super().__init__(table=table)
-        self.insert_values = insert_values
-        self.returning = returning
+        self.insert_values = insert_values or {}
+        self.returning = returning or []
 
+        batch_values = batch_values or []
         for item in batch_values:
             if not isinstance(item, dict):
                 raise ValueError(
                     f"{item} should be a dictionnary"
                 )
-        self.batch_values = batch_values
 
-    @property
-    def node_name(self):
-        return 'insert'
+        # Each row has to provide the same columns otherwise
+        # a missing value would silently be inserted as an
+        # empty string and an additional one would be dropped
+        if batch_values:
+            columns = batch_values[0].keys()
+            for item in batch_values:
+                if item.keys() != columns:
+                    raise ValueError(
+                        f"{item} should provide the columns: "
+                        f"{', '.join(columns)}"
+                    )
+        self.batch_values = batch_values
 
     def as_sql(self, backend):
         template = self.template_sql
 
         if self.batch_values:
-            columns = self.batch_values[0].keys()
-
+            columns = list(self.batch_values[0].keys())
+
+            # The backend methods are looked up once
+            # instead of once per row to insert. The values
+            # of each row are taken in the order of the columns
+            # since the dictionnaries can list their keys in
+            # a different order
+            comma_join = backend.comma_join
+            quote_values = backend.quote_values
             values = []
             for item in self.batch_values:
-                quoted_values = backend.quote_values(item.values())
-                joined = backend.comma_join(quoted_values)
-                values.append(f"({joined})")
+                row = quote_values(item[column] for column in columns)
+                values.append(f"({comma_join(row)})")
 
             joined_values = backend.comma_join(values)
             template = self.bactch_insert_sql
@@ -489,6 +536,7 @@ class JoinNode(BaseNode):
     """Node used to create the SQL statement
     that allows foreign key joins"""
 
+    node_name = 'join'
     template_sql = '{join_type} join {table} on {condition}'
 
     cross_join = 'cross join {field}'
@@ -505,10 +553,6 @@ class JoinNode(BaseNode):
         self.table = table
         self.relationship_map = relationship_map
 
-    @property
-    def node_name(self):
-        return 'join'
-
     def as_sql(self, backend):
         # if self.join_type == 'cross':
         #     return []
@@ -530,16 +574,13 @@ class JoinNode(BaseNode):
 
 
 class IntersectNode(BaseNode):
+    node_name = 'intersect'
     template_sql = '{0} intersect {1}'
 
     def __init__(self, left_select, right_select):
         self.left_select = left_select
         self.right_select = right_select
 
-    @property
-    def node_name(self):
-        return 'intersect'
-
     def as_sql(self, backend):
         # lhv = self.left_select.as_sql(backend)
         # rhv = self.right_select.as_sql(backend)
@@ -551,6 +592,7 @@ class IntersectNode(BaseNode):
 
 
 class ViewNode(BaseNode):
+    node_name = 'view'
     template_sql = 'create view if not exists {name} as {select_node}'
 
     def __init__(self, name, queryset, temporary=False):
@@ -558,10 +600,6 @@ class ViewNode(BaseNode):
         self.temporary = temporary
         self.queryset = queryset
 
-    @property
-    def node_name(self):
-        return 'view'
-
     def as_sql(self, backend):
         if not hasattr(self.queryset, 'load_cache'):
             raise ValueError(
@@ -93,12 +93,14 @@ class Field:
     @classmethod
     def create(cls, name, params):
         instance = cls(name)
-        instance.base_field_parameters = params
         if 'null' in params:
             instance.null = True
 
         if 'primary key' in params:
             instance.primary_key = True
+
+        if 'unique' in params:
+            instance.unique = True
         instance.field_parameters()
         return instance
 
@@ -3,7 +3,7 @@ import re
 import sqlite3
 import pathlib
 from sqlite3 import Cursor, Row
-from typing import Any, Callable, DefaultDict, List, Literal, Optional, Tuple, Union
+from typing import Any, Callable, ClassVar, DefaultDict, List, Literal, Optional, Tuple, Union
 
 from lorelie.database.base import Database
 from lorelie.database.functions.base import Functions
@@ -15,7 +15,7 @@ from lorelie.tables import Table
 
 class Connections:
     connections_map: dict[str, SQLiteBackend] = ...
-    created_connections: set[SQLiteBackend] = ...
+    created_connections: dict[SQLiteBackend, None] = ...
 
     def __repr__(self): ...
     def __getitem__(self, name: str) -> SQLiteBackend: ...
@@ -66,12 +66,13 @@ def row_factory(
 ) -> Callable[[Cursor, Row], BaseRow]: ...
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class AnnotationMap:
     sql_statements_dict: dict = ...
     alias_fields: list = ...
     field_names: list = ...
     annotation_type_map: dict = ...
+    grouping_types: ClassVar[frozenset[str]] = ...
 
     @property
     def joined_final_sql_fields(self) -> list[str]: ...
@@ -203,6 +204,7 @@ class SQL:
 
 
 class SQLiteBackend(SQL):
+    connection_pragmas: list[str] = ...
     database_name: str = ...
     database_path: pathlib.Path = ...
     database_instance: Database = ...
@@ -223,6 +225,14 @@ class SQLiteBackend(SQL):
     def set_current_table_from_row(self, row: BaseRow) -> None: ...
     def list_table_columns(self, table: Table) -> QuerySet[BaseRow]: ...
 
+    def list_all_table_columns(self) -> DefaultDict[str, set[str]]: ...
+
+    def create_table_fields_sql(
+        self,
+        table: Table,
+        columns_to_create: list[str]
+    ) -> list[str]: ...
+
     def create_table_fields(
         self,
         table: Table,
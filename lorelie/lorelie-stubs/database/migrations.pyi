@@ -1,42 +1,70 @@
 import pathlib
 from dataclasses import dataclass
 from functools import cached_property
-from typing import DefaultDict, List, Literal, Type
+from typing import Any, Iterable, List, Literal, Type
 
 from lorelie.backends import SQLiteBackend
 from lorelie.database.base import Database
 from lorelie.fields.base import Field
 from lorelie.tables import Table
 
+FIELD_CLASSES_REGISTRY: dict[str, type[Field]] = ...
 
-@dataclass
+
+@dataclass(slots=True)
 class Schema:
     table: type = ...
     database: type = ...
     fields: list = ...
     field_params: list = ...
+    indexes: dict = ...
+    constraints: dict = ...
 
     def __hash__(self) -> int: ...
 
-    def prepare(self) -> None: ...
+    def prepare(self, field_params: list[list[str]] | None = ...) -> None: ...
+    def to_dict(self) -> dict[str, Any]: ...
+
+
+def schema_encoder(value: Schema) -> dict[str, Any]: ...
+
+
+def schema_fingerprint(
+    tables: Iterable[Table],
+    field_params_map: dict[str, list[list[str]]] = ...,
+    backend: SQLiteBackend = ...
+) -> str: ...
+
+
+def serialize_migration(content: dict[str, Any]) -> str: ...
+def migration_id() -> str: ...
+def migration_date() -> str: ...
+def read_migration_file(path: pathlib.Path) -> dict[str, Any]: ...
+
+
+def write_migration_file(
+    path: pathlib.Path,
+    content: dict[str, Any]
+) -> None: ...
 
 
 class Migrations:
     CACHE: dict[str] = ...
     backend_class = Type[SQLiteBackend]
+    insert_migration_sql: str = ...
     file: pathlib.Path = ...
     database: Database = ...
     database_name: str = ...
     file_id: str = ...
-    migration_table_map: list[str] = ...
-    fields_map: DefaultDict[list] = ...
+    backend: SQLiteBackend = ...
+    migration_table_map: set[str] = ...
     tables_for_creation: set = ...
     tables_for_deletion: set = ...
     existing_tables: set = ...
     has_migrations: bool = ...
     tables: dict[str] = ...
     migrated: bool = Literal[False]
-    schemas: DefaultDict[Schema] = ...
+    schemas: dict[str, Schema] = ...
     pending_migration: dict = ...
 
     def __init__(self, database: Database) -> None: ...
@@ -48,6 +76,9 @@ class Migrations:
     @cached_property
     def read_content(self) -> dict: ...
 
+    @cached_property
+    def tables_by_name(self) -> dict[str, dict]: ...
+
     def _write_fields(self, table: Table) -> None: ...
 
     def _write_indexes(self, table: Table,
@@ -55,10 +86,21 @@ class Migrations:
     def _write_constraints(
         self, table: Table, backend: SQLiteBackend = ...) -> list: ...
 
+    def _get_or_create_schema(self, table: Table) -> Schema: ...
+
     def create_migration_table(self) -> None: ...
     def migrate(self, table_instances: dict[str, Table]) -> None: ...
-    def check_fields(self, table: Table, backend: SQLiteBackend) -> None: ...
+
+    def discard_fingerprint(self) -> None: ...
+
+    def check_fields(
+        self,
+        table: Table,
+        existing_columns: set[str],
+        backend: SQLiteBackend
+    ) -> list[str]: ...
+
     def blank_migration(self) -> dict[str]: ...
     def make_migrations(self, tables: List[Table]) -> None: ...
-    def get_table_fields(self, name: str) -> list[dict[str]]: ...
+    def get_table_fields(self, name: str) -> list[list[str]]: ...
     def reconstruct_table_fields(self, table: Table) -> list[Field]: ...
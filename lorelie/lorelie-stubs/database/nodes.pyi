@@ -1,4 +1,6 @@
 import dataclasses
+import re
+from functools import cached_property
 from typing import (Any, Callable, Dict, Literal, Optional, Tuple, Union,
                     override)
 
@@ -58,6 +60,7 @@ class ComplexNode:
 
 
 class BaseNode:
+    node_name: str = ...
     template_sql: str = ...
     table: Table = ...
     fields: list = ...
@@ -74,9 +77,6 @@ class BaseNode:
     def __contains__(self, value: BaseNode) -> bool: ...
     def __and__(self, node: BaseNode) -> BaseNode: ...
 
-    @property
-    def node_name(self) -> str: ...
-
     def as_sql(self, backend: SQLiteBackend) -> list[str]: ...
 
 
@@ -92,12 +92,14 @@ class SelectNode(BaseNode):
     ) -> None: ...
 
     @override
-    def __call__(self, *fields: str) -> SelectNode: ...
+    def __call__(self, *fields: str, **kwargs: Any) -> SelectNode: ...
 
 
 class WhereNode(BaseNode):
     expressions: dict[str, Functions] = ...
     func_expressions: list[Functions] = ...
+    invert: bool = ...
+    cached_sql: tuple[SQLiteBackend, list[str]] | None = ...
 
     def __init__(self, *args: Functions, **expressions) -> None: ...
 
@@ -106,9 +108,12 @@ class WhereNode(BaseNode):
 
 
 class OrderByNode(BaseNode):
+    field_regex: re.Pattern[str] = ...
     ascending: set = ...
     descending: set = ...
+    ordered_fields: list[tuple[str, bool]] = ...
     cached_fields: list[str] = ...
+    cached_sql: tuple[SQLiteBackend, list[str]] | None = ...
 
     def __init__(self, table: Table, *fields: str) -> None: ...
     def __hash__(self) -> int: ...
@@ -135,6 +140,9 @@ class UpdateNode(BaseNode):
         **where_expressions: str
     ) -> None: ...
 
+    @cached_property
+    def where_node(self) -> WhereNode: ...
+
 
 class DeleteNode(BaseNode):
     def __init__(
@@ -146,6 +154,9 @@ class DeleteNode(BaseNode):
         **where_expressions: str
     ) -> None: ...
 
+    @cached_property
+    def where_node(self) -> WhereNode: ...
+
     @override
     def as_sql(self, backend: SQLiteBackend) -> list[str]: ...
 
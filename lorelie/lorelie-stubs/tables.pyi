@@ -110,4 +110,10 @@ class Table(AbstractTable):
     def create_table_sql(self, fields: list[str]) -> list[str]: ...
     def drop_table_sql(self) -> list[str]: ...
     def build_all_field_parameters(self) -> list[str]: ...
+    def prepare_sql(
+        self,
+        database: Database,
+        field_params: list[list[str]] = ...
+    ) -> list[str]: ...
+
     def prepare(self, database: Database) -> None: ...
@@ -73,14 +73,17 @@ class Query:
 
         try:
             result = instance.backend.connection.executescript(script)
-        except OperationalError as e:
-            print(e, script)
-            raise
-        except IntegrityError as e:
-            print(e, script)
-            raise
         except Exception as e:
-            print(e, script)
+            # The script itself is kept with the other
+            # queries and is not written to the output
+            lorelie_logger.warning(f"Could not run script: {e}")
+            # A statement that fails in the middle of the
+            # script leaves the transaction opened by "begin"
+            # which would prevent any other script to run. The
+            # connection is in autocommit mode where rollback()
+            # does nothing so the statement has to be executed
+            if instance.backend.connection.in_transaction:
+                instance.backend.connection.execute('rollback')
             raise
         else:
             # print(script)
@@ -103,7 +106,7 @@ class Query:
                 for query in log_queries:
                     lorelie_logger.info(f"\"{query}\"")
 
-            return instance
+        return instance
 
     @property
     def return_single_item(self):
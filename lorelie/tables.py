@@ -321,13 +321,15 @@ class Table(AbstractTable):
             if field.is_relationship_field:
                 yield field.relationship_field_params
 
-    def prepare(self, database):
-        """Prepares the table with additional parameters, 
-        gets all the field parameters to be used in order to
-        create the current table and then creates the create SQL
-        statement that will then be used to creates the
-        different tables in the database using the database"""
-        field_params = self.build_all_field_parameters()
+    def prepare_sql(self, database, field_params=None):
+        """Gets all the field parameters to be used in order
+        to create the current table and returns the create SQL
+        statements without running them. This allows the
+        statements of multiple tables to be run together.
+        Parameters that were already built can be passed
+        using `field_params`"""
+        if field_params is None:
+            field_params = self.build_all_field_parameters()
         field_params = [
             self.backend.simple_join(params)
             for params in field_params
@@ -344,7 +346,15 @@ class Table(AbstractTable):
                     continue
 
         joined_fields = self.backend.comma_join(field_params)
-        create_sql = self.create_table_sql(joined_fields)
+        return self.create_table_sql(joined_fields)
+
+    def prepare(self, database):
+        """Prepares the table with additional parameters, 
+        gets all the field parameters to be used in order to
+        create the current table and then creates the create SQL
+        statement that will then be used to creates the
+        different tables in the database using the database"""
+        create_sql = self.prepare_sql(database)
 
         query = self.query_class(table=self)
         query.add_sql_nodes(create_sql)
@@ -274,6 +274,16 @@ class TestBackendCoreFunctions(LorelieTestCase):
         print(vars(result[1]))
         print(result)
 
+    def test_list_all_table_columns(self):
+        self.create_database()
+        conn = connections.get_last_connection()
+        result = conn.list_all_table_columns()
+        self.assertIn('celebrities', result)
+        self.assertSetEqual(
+            result['celebrities'],
+            {'id', 'name', 'height', 'created_on'}
+        )
+
 #     @unittest.expectedFailure
 #     def test_drop_indexes_sql(self):
 #         table = self.db.get_table('celebrities')
@@ -11,7 +11,7 @@ class TestIndex(LorelieTestCase):
 
         instance = Index('test_name', fields=['name'])
         result = instance.as_sql(table)
-        self.assertTrue("create index idx_test_name_" in result)
+        self.assertTrue("create index if not exists idx_test_name_" in result)
         self.assertTrue("on celebrities (name)" in result)
 
     def test_with_functions(self):
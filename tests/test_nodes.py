@@ -1,7 +1,7 @@
 import unittest
 
 from lorelie.database.nodes import (BaseNode, ComplexNode, DeleteNode, InsertNode, IntersectNode, JoinNode,
-                                    OrderByNode, SelectNode, UpdateNode, ViewNode,
+                                    OrderByNode, SelectMap, SelectNode, UpdateNode, ViewNode,
                                     WhereNode)
 from lorelie.expressions import Q
 from lorelie.test.testcases import LorelieTestCase
@@ -70,6 +70,34 @@ class TestInsertNode(LorelieTestCase):
             ]
         )
 
+    def test_batch_values_order(self):
+        node = InsertNode(
+            self.create_table(),
+            batch_values=[
+                {'name': 'Kendall', 'age': 28},
+                {'age': 26, 'name': 'Kylie'}
+            ]
+        )
+        result = node.as_sql(self.create_connection())
+        self.assertEqual(
+            result[0],
+            "insert into celebrities (name, age) values ('Kendall', 28), ('Kylie', 26)"
+        )
+
+    def test_batch_values_different_columns(self):
+        table = self.create_table()
+        with self.assertRaises(ValueError):
+            InsertNode(
+                table,
+                batch_values=[{'name': 'Kendall', 'age': 28}, {'name': 'Kylie'}]
+            )
+
+        with self.assertRaises(ValueError):
+            InsertNode(
+                table,
+                batch_values=[{'name': 'Kendall'}, {'name': 'Kylie', 'age': 26}]
+            )
+
 
 class TestSelectNode(LorelieTestCase):
     def test_structure(self):
@@ -96,6 +124,38 @@ class TestSelectNode(LorelieTestCase):
             ['select * from celebrities limit 10']
         )
 
+    def test_adding_fields(self):
+        node = SelectNode(self.create_table(), 'name', distinct=True)
+        new_node = node('age')
+        self.assertIsNot(new_node, node)
+        self.assertListEqual(
+            new_node.as_sql(self.create_connection()),
+            ['select distinct name, age from celebrities']
+        )
+        self.assertEqual(node.fields, ('name',))
+
+
+class TestSelectMap(LorelieTestCase):
+    def test_resolve(self):
+        table = self.create_table()
+        select_map = SelectMap(
+            select=SelectNode(table),
+            where=WhereNode(name='Kendall'),
+            order_by=OrderByNode(table, 'name'),
+            limit=10,
+            groupby='group by id'
+        )
+        self.assertListEqual(
+            select_map.resolve(self.create_connection()),
+            [
+                'select * from celebrities',
+                "where name='Kendall'",
+                'group by id',
+                'order by name asc',
+                'limit 10'
+            ]
+        )
+
 
 class TestWhereNode(LorelieTestCase):
     def test_structure(self):
@@ -159,6 +219,22 @@ class TestWhereNode(LorelieTestCase):
             ["where firstname='Kendall' and lastname='Jenner'"]
         )
 
+    def test_cached_sql(self):
+        backend = self.create_connection()
+
+        node = WhereNode(firstname='Kendall')
+        sql = node.as_sql(backend)
+        self.assertIs(node.cached_sql[0], backend)
+        self.assertListEqual(node.as_sql(backend), sql)
+
+        # Inverting the node should not return
+        # the clause that was previously built
+        ~node
+        self.assertListEqual(
+            node.as_sql(backend),
+            ["where not firstname='Kendall'"]
+        )
+
     def test_cannot_use_q_functions(self):
         node = UpdateNode(
             self.create_table(),
@@ -215,6 +291,20 @@ class TestOrderByNode(LorelieTestCase):
             ['order by name asc, age desc']
         )
 
+    def test_fields_order(self):
+        table = self.create_table()
+        a = OrderByNode(table, '-age', 'name')
+        self.assertListEqual(
+            a.as_sql(self.create_connection()),
+            ['order by age desc, name asc']
+        )
+
+        b = OrderByNode(table, 'name', 'height')
+        self.assertListEqual(
+            (a & b).cached_fields,
+            ['age', 'name', 'height']
+        )
+
 
 class TestUpdateNode(LorelieTestCase):
     def test_structure(self):
@@ -39,6 +39,10 @@ class TestQuery(LorelieTestCase):
         with self.assertRaises(sqlite3.OperationalError):
             query.run_script(backend=backend, sql_tokens=sql)
 
+        # The transaction opened by the failed
+        # script should have been rolled back
+        self.assertFalse(backend.connection.in_transaction)
+
     def test_working_execution(self):
         backend = self.create_connection()
         query = Query(backend=backend)
@@ -144,6 +144,17 @@ class TestTable(LorelieTestCase):
         table.prepare(db)
         self.assertIn(constraint, table.table_constraints)
 
+    def test_prepare_sql(self):
+        table = Table('my_table', fields=[CharField('name')])
+        db = Database(table)
+        sql = table.prepare_sql(db)
+        self.assertListEqual(
+            sql,
+            ['create table if not exists my_table (name text not null, id integer primary key autoincrement not null)']
+        )
+        # Building the statements does not create the table
+        self.assertFalse(table.is_prepared)
+
     def test_adding_an_existing_constraint_to_the_table(self):
         # TODO: Prevent the user from being able to create two
         # similar constraints in a given table